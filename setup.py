@@ -48,11 +48,24 @@ setup(
         "License :: OSI Approved :: MIT License",
     ],
     python_requires=">=3.6",
-    install_requires=["dnaio >=0.9.0"],
+    install_requires=[
+        "dnaio >=0.9.0",
+        # xopen uses python-isal's igzip for fast gzip (de)compression at
+        # compression levels 0-3 when it is installed.
+        "xopen >=1.2.0",
+        "isal >=0.11.0; platform_machine == 'x86_64' or "
+        "platform_machine == 'AMD64' or platform_machine == 'aarch64'",
+    ],
     ext_modules=[
-        Extension("fastqdedup._trie", ["src/fastqdedup/_triemodule.c"]),
-        Extension("fastqdedup._distance", ["src/fastqdedup/_distancemodule.c"]),
-        Extension("fastqdedup._fastq", ["src/fastqdedup/_fastqmodule.c"]),
+        # The headers are listed in depends, so changing them triggers a
+        # rebuild of the extensions that include them.
+        Extension("fastqdedup._trie", ["src/fastqdedup/_triemodule.c"],
+                  depends=["src/fastqdedup/distances.h"]),
+        Extension("fastqdedup._distance", ["src/fastqdedup/_distancemodule.c"],
+                  depends=["src/fastqdedup/distances.h"]),
+        Extension("fastqdedup._fastq", ["src/fastqdedup/_fastqmodule.c"],
+                  depends=["src/fastqdedup/score_to_error_rate.h"]),
+        Extension("fastqdedup._hashset", ["src/fastqdedup/_hashsetmodule.c"]),
     ],
     entry_points={"console_scripts": [
         "fastqdedup = fastqdedup:main"]}
@@ -20,23 +20,30 @@ import datetime
 import functools
 import io
 import logging
+import operator
+import os
 import resource
 import time
 from typing import (Any, Callable, Dict, IO, Iterable, Iterator, List,
-                    Optional, Set, Tuple)
+                    Optional, Sequence, Tuple)
 
 import dnaio
 
 import xopen
 
-from ._distance import within_distance
+from ._distance import split_within_distance
 from ._fastq import average_error_rate as fastq_average_error_rate
+from ._fastq import join_slices
+from ._hashset import HashSet
 from ._trie import Trie
 
 DEFAULT_PREFIX = "fastqdedup_R"
 DEFAULT_MAX_DISTANCE = 1
 DEFAULT_CLUSTER_DISSECTION = "directional"
 DEFAULT_MAX_AVERAGE_ERROR_RATE = 0.001
+# A separate (de)compression thread only pays off when it does not compete
+# with the main loop for the same CPU.
+DEFAULT_THREADS = 1 if (os.cpu_count() or 1) > 1 else 0
 
 
 class Timer:
@@ -51,8 +58,10 @@ class Timer:
         return delta
 
 
-def file_to_fastq_reader(filename: str) -> Iterator[dnaio.SequenceRecord]:
-    opener = functools.partial(xopen.xopen, threads=0)
+def file_to_fastq_reader(filename: str,
+                         threads: int = DEFAULT_THREADS
+                         ) -> Iterator[dnaio.SequenceRecord]:
+    opener = functools.partial(xopen.xopen, threads=threads)
     with dnaio.open(filename, mode="r", opener=opener) as fastqreader:  # type: ignore
         yield from fastqreader
 
@@ -65,7 +74,9 @@ def cluster_dissection_directional(cluster: List[Tuple[int, str]],
     within hamming distance and have a count for which 2n-1 is lower than the
     template count, assume they are derived trough PCR artifact. In that case
     add them to the template chain for testing."""
-    cluster = sorted(cluster)
+    # Only sort on the count. Comparing the strings of reads with equal
+    # counts is expensive and not needed.
+    cluster = sorted(cluster, key=operator.itemgetter(0))
     while cluster:
         # The last read has the highest count since we sorted (ascending order
         # is default).
@@ -78,16 +89,12 @@ def cluster_dissection_directional(cluster: List[Tuple[int, str]],
         for template_count, template_string in template_list:
             if not cluster:
                 break  # fast exit when nothing to compare
-            distinct_list = []
-            for item in cluster:
-                compare_count, compare_string = item
-                if (2 * compare_count - 1) <= template_count:
-                    if within_distance(template_string, compare_string,
-                                       max_distance, use_edit_distance):
-                        template_list.append(item)
-                        continue
-                distinct_list.append(item)
-            cluster = distinct_list
+            # Only reads with a count for which 2n-1 is not higher than the
+            # template count are tested.
+            within_list, cluster = split_within_distance(
+                template_string, cluster, max_distance, use_edit_distance,
+                max_count=(template_count + 1) // 2)
+            template_list.extend(within_list)
         yield original_string
 
 
@@ -96,9 +103,7 @@ def cluster_dissection_highest_count(cluster: List[Tuple[int, str]],
                                      use_edit_distance: bool = False,
                                      ) -> Iterator[str]:
     """Select the read with the highest count. Only yields 1 read."""
-    cluster = sorted(cluster, reverse=True)
-    # We sorted in descending order, so the first read has the highest count.
-    _, string = cluster[0]
+    _, string = max(cluster, key=operator.itemgetter(0))
     yield string
 
 
@@ -108,18 +113,13 @@ def cluster_dissection_adjacency(cluster: List[Tuple[int, str]],
                                  ) -> Iterator[str]:
     """Take the read with the highest count, find all the reads are not
     directly adjacent within max distance and repeat."""
-    cluster = sorted(cluster, reverse=True)
+    cluster = sorted(cluster, key=operator.itemgetter(0), reverse=True)
     while cluster:
         # We sorted in descending order, so the first read has the highest count.
         _, template_string = cluster[0]
-        distinct_list = []
-        for item in cluster[1:]:
-            _, compare_string = item
-            if not within_distance(template_string, compare_string,
-                                   max_distance, use_edit_distance):
-                distinct_list.append(item)
+        _, cluster = split_within_distance(template_string, cluster[1:],
+                                           max_distance, use_edit_distance)
         yield template_string
-        cluster = distinct_list[:]
 
 
 ClusterDissectionFunc = Callable[[List[Tuple[int, str]], int, bool], Iterator[str]]
@@ -134,19 +134,19 @@ def trie_stats(trie: Trie) -> str:
     outbuffer = io.StringIO()
     raw_stats = trie.raw_stats()
     layer_size = len(trie.alphabet) + 1
-    all_totals = [0 for _ in range(layer_size + 1)]
+    layer_totals = [sum(layer_stats) for layer_stats in raw_stats]
+    # Sum the columns with zip rather than indexing each element.
+    all_totals = [sum(column) for column in zip(*raw_stats)]
+    all_totals.append(sum(layer_totals))
+    # One format string for an entire line, rather than a format call for
+    # each field.
+    line_format = "{:10}" * (layer_size + 2) + "\n"
     outbuffer.write("layer     terminal  " +
-                    "".join(f"{i:10}" for i in range(1, layer_size)) +
+                    ("{:10}" * (layer_size - 1)).format(*range(1, layer_size)) +
                     "     total\n")
-    for i, layer_stats in enumerate(raw_stats):
-        total = sum(layer_stats)
-        for j in range(layer_size):
-            all_totals[j] += layer_stats[j]
-        all_totals[layer_size] += total
-        line = [str(i)] + layer_stats + [total]  # type: ignore
-        outbuffer.write("".join(f"{i:10}" for i in line) + "\n")
-    last_line = ["total"] + all_totals  # type: ignore
-    outbuffer.write("".join(f"{i:10}" for i in last_line) + "\n")
+    for i, (layer_stats, total) in enumerate(zip(raw_stats, layer_totals)):
+        outbuffer.write(line_format.format(str(i), *layer_stats, total))
+    outbuffer.write(line_format.format("total", *all_totals))
     node_memory_usage = sum((8 + 8 * i) * all_totals[i] for i in range(layer_size))
     total_memory_usage = trie.memory_size()
     suffix_memory_usage = total_memory_usage - node_memory_usage
@@ -157,18 +157,59 @@ def trie_stats(trie: Trie) -> str:
     return outbuffer.getvalue()
 
 
+def keyfunc_from_check_slices(
+        check_slices: Iterable[slice]
+) -> Callable[[Tuple[dnaio.SequenceRecord, ...]], str]:
+    slices = tuple(check_slices)
+    # The key function runs for every record. For one and two files a
+    # fixed-arity function avoids building a list of sequences first.
+    # The slices are bound as default arguments, which are faster to look
+    # up than closure variables.
+    if len(slices) == 1:
+        def single_keyfunc(records: Tuple[dnaio.SequenceRecord, ...],
+                           s0: slice = slices[0]) -> str:
+            return records[0].sequence[s0]
+        return single_keyfunc
+    if len(slices) == 2:
+        def paired_keyfunc(records: Tuple[dnaio.SequenceRecord, ...],
+                           s0: slice = slices[0],
+                           s1: slice = slices[1]) -> str:
+            return records[0].sequence[s0] + records[1].sequence[s1]
+        return paired_keyfunc
+
+    def keyfunc(records: Tuple[dnaio.SequenceRecord, ...],
+                slices: Tuple[slice, ...] = slices) -> str:
+        return join_slices([record.sequence for record in records], slices)
+    return keyfunc
+
+
 def joinfunc_from_check_slices(
         check_slices: Iterable[slice]
-) -> Callable[[Iterable[str]], str]:
-    def joinfunc(strings: Iterable[str]):
-        return "".join(string[slc]
-                       for string, slc
-                       in zip(strings, check_slices))
+) -> Callable[[Sequence[str]], str]:
+    """Kept for backwards compatibility. keyfunc_from_check_slices takes the
+    records rather than their sequences and is faster."""
+    slices = tuple(check_slices)
+
+    def joinfunc(strings: Sequence[str]):
+        return join_slices(strings, slices)
     return joinfunc
 
 
+def keyfunc_join_sequences(records: Tuple[dnaio.SequenceRecord, ...]) -> str:
+    return "".join([record.sequence for record in records])
+
+
+def slicefunc_from_check_slices(
+        check_slices: Iterable[slice]
+) -> Callable[[Iterable[str]], List[str]]:
+    def slicefunc(strings: Iterable[str]):
+        return [string[slc] for string, slc in zip(strings, check_slices)]
+    return slicefunc
+
+
 def fastq_files_to_records(
-        input_files: List[str]
+        input_files: List[str],
+        threads: int = DEFAULT_THREADS,
 ) -> Iterator[Tuple[dnaio.SequenceRecord, ...]]:
     """
 
@@ -176,7 +217,7 @@ def fastq_files_to_records(
     :param keyfunc:
     :return:
     """
-    input_readers = [file_to_fastq_reader(f) for f in input_files]
+    input_readers = [file_to_fastq_reader(f, threads) for f in input_files]
     for records in zip(*input_readers):  # type: Tuple[dnaio.SequenceRecord, ...]
         if len(records) > 1 and not dnaio.records_are_mates(*records):
             raise dnaio.FastqFormatError(
@@ -186,24 +227,48 @@ def fastq_files_to_records(
         yield records
 
 
+def open_output_files(output_files: List[str],
+                      output_stack: contextlib.ExitStack,
+                      threads: int = DEFAULT_THREADS,
+                      ) -> List[IO[Any]]:
+    """Open the output files for writing on output_stack."""
+    output_opener = functools.partial(xopen.xopen, mode="wb",
+                                      compresslevel=1, threads=threads)
+    return [output_stack.enter_context(output_opener(x))
+            for x in output_files]
+
+
 def filter_fastq_files_on_set(
         input_files: List[str],
         output_files: List[str],
-        filter_set: Set[Any],
-        keyfunc: Callable[[Iterable[dnaio.SequenceRecord]], Any]
+        filter_set: HashSet,
+        keyfunc: Callable[[Tuple[dnaio.SequenceRecord, ...]], str],
+        discarded: Optional[bytearray] = None,
+        threads: int = DEFAULT_THREADS,
 ):
-    input_readers = [file_to_fastq_reader(f) for f in input_files]
-    output_stack = contextlib.ExitStack()
-    output_opener = functools.partial(xopen.xopen, mode="wb",
-                                      compresslevel=1, threads=0)
-    output_writers: List[IO[Any]] = [
-        output_stack.enter_context(output_opener(x)) for x in output_files]
-    for records in zip(*input_readers):
-        key = keyfunc(records)
-        if key in filter_set:
-            filter_set.remove(key)
-            for output, record in zip(output_writers, records):
-                output.write(record.fastq_bytes())
+    """
+    Write the records whose key hash is in filter_set to the output files.
+    Only the first record with a particular key is written.
+
+    :param discarded: A bitmap with a bit set for each record, by its
+                      position in the input files, that must not be written.
+    """
+    input_readers = [file_to_fastq_reader(f, threads) for f in input_files]
+    with contextlib.ExitStack() as output_stack:
+        output_writers = open_output_files(output_files, output_stack, threads)
+        # Look up the write methods once rather than for every record.
+        output_writes = [writer.write for writer in output_writers]
+        for index, records in enumerate(zip(*input_readers)):
+            key_hash = hash(keyfunc(records))
+            if key_hash in filter_set:
+                # Only records that would be written are looked up in the
+                # bitmap.
+                if discarded and (index >> 3) < len(discarded) and (
+                        discarded[index >> 3] & (1 << (index & 7))):
+                    continue
+                filter_set.remove(key_hash)
+                for write, record in zip(output_writes, records):
+                    write(record.fastq_bytes())
 
 
 def deduplicate_cluster(
@@ -214,6 +279,7 @@ def deduplicate_cluster(
     max_average_error_rate: float = DEFAULT_MAX_AVERAGE_ERROR_RATE,
     cluster_dissection_func: ClusterDissectionFunc = cluster_dissection_directional,
     use_edit_distance: bool = False,
+    threads: int = DEFAULT_THREADS,
 ):
     if len(input_files) != len(output_files):
         raise ValueError(f"Amount of output files ({len(output_files)}) "
@@ -226,38 +292,91 @@ def deduplicate_cluster(
 
     # Create a keyfunc in order to collapse multiple FASTQ records into
     # one key that can be used to determine the clusters.
+    # The qualities are not joined but passed to the average error rate
+    # function as a list.
     if check_slices:
-        joinfunc = joinfunc_from_check_slices(check_slices)
+        keyfunc = keyfunc_from_check_slices(check_slices)
+        slicefunc = slicefunc_from_check_slices(check_slices)
     else:
-        joinfunc = "".join
+        keyfunc = keyfunc_join_sequences
+        slicefunc = list
+    # With a single file and no slices the key is simply the sequence. Taking
+    # it directly saves creating a list and calling join for every record.
+    key_is_sequence = not check_slices and len(input_files) == 1
 
-    record_tuples = fastq_files_to_records(input_files)
+    record_tuples = fastq_files_to_records(input_files, threads)
     filter_on_quality = max_average_error_rate < 1.0
     total_records = 0
     discarded_records = 0
     timer = Timer()
     logger = logging.getLogger("fastqdedup")
-    trie = Trie(alphabet="ACGTN")
-
-    for record_tuple in record_tuples:
-        qualities = joinfunc(record.qualities
-                             for record in record_tuple
-                             if record.qualities is not None)
-        total_records += 1
-        if (filter_on_quality and
-                fastq_average_error_rate(qualities) > max_average_error_rate):
-            discarded_records += 1
-            continue
-        key = joinfunc(record.sequence for record in record_tuple)
-        trie.add_sequence(key)
+    # Not the keys, but the hash values of the keys are stored in the set.
+    # This saves a lot of memory. HashSet stores them as 64-bit integers
+    # rather than int objects, which saves even more.
+    deduplicated_set = HashSet()
+    # When no distance is allowed, every cluster consists of a single
+    # sequence. The trie is not needed in that case, the hashes suffice.
+    # Also, the first record with a particular key can be written
+    # immediately, so the input files only need to be read once.
+    exact_match = max_distance == 0
+
+    # Records discarded for low quality are marked with one bit per record,
+    # so the filter pass does not write them when their key was selected
+    # from another record.
+    discarded = bytearray()
+
+    # Bind the methods to local names as this loop runs for every record.
+    add_hash = deduplicated_set.add
+    with contextlib.ExitStack() as output_stack:
+        if exact_match:
+            output_writes = [
+                writer.write for writer in
+                open_output_files(output_files, output_stack, threads)]
+        else:
+            trie = Trie(alphabet="ACGTN")
+            add_sequence = trie.add_sequence
+        for record_tuple in record_tuples:
+            total_records += 1
+            if filter_on_quality:
+                qualities = slicefunc([record.qualities
+                                       for record in record_tuple
+                                       if record.qualities is not None])
+                if fastq_average_error_rate(qualities) > max_average_error_rate:
+                    discarded_records += 1
+                    if not exact_match:
+                        index = total_records - 1
+                        if (index >> 3) >= len(discarded):
+                            discarded.extend(
+                                bytes((index >> 3) + 1 - len(discarded)))
+                        discarded[index >> 3] |= 1 << (index & 7)
+                    continue
+            if key_is_sequence:
+                key = record_tuple[0].sequence
+            else:
+                key = keyfunc(record_tuple)
+            if exact_match:
+                key_hash = hash(key)
+                if key_hash not in deduplicated_set:
+                    add_hash(key_hash)
+                    for write, record in zip(output_writes, record_tuple):
+                        write(record.fastq_bytes())
+            else:
+                add_sequence(key)
     if filter_on_quality:
         logger.info(
             f"{discarded_records} records out of {total_records} "
             f"records had an error rate higher than {max_average_error_rate} "
             f"and were discarded.")
+    if exact_match:
+        logger.info(f"Found {len(deduplicated_set)} distinct reads in "
+                    f"{total_records - discarded_records} sequences and "
+                    f"wrote them to the output files. "
+                    f"({timer.get_difference()})")
+        return
+
     logger.info(f"Processed {trie.number_of_sequences} sequences. "
                 f"({timer.get_difference()})")
-    if logger.level <= logging.DEBUG:
+    if logger.isEnabledFor(logging.DEBUG):
         # Do not perform expensive stats calc when not requested.
         stats = trie_stats(trie)
         logger.debug(f"Calculated stats. ({timer.get_difference()})")
@@ -265,9 +384,6 @@ def deduplicate_cluster(
 
     # Create a deduplicated set by popping of clusters from the trie and
     # selecting the most prevalent read per cluster.
-    # Not the keys, but the hash values of the keys are stored in the set.
-    # This saves a lot of memory.
-    deduplicated_set: Set[int] = set()
     number_of_clusters = 0
     while trie.number_of_sequences:
         cluster = trie.pop_cluster(max_distance, use_edit_distance)
@@ -280,10 +396,8 @@ def deduplicate_cluster(
                 f"in {number_of_clusters} clusters."
                 f"({timer.get_difference()})")
 
-    def hashfunc(records):
-        return hash(joinfunc(record.sequence for record in records))
-
-    filter_fastq_files_on_set(input_files, output_files, deduplicated_set, hashfunc)
+    filter_fastq_files_on_set(input_files, output_files, deduplicated_set,
+                              keyfunc, discarded, threads)
     logger.info(f"Filtered FASTQ files based on distinct reads from each cluster. "
                 f"({timer.get_difference()}) ")
 
@@ -354,6 +468,12 @@ def argument_parser() -> argparse.ArgumentParser:
              "'directional' is similar to adjacency but uses counts to "
              "determine if an error is a PCR/sequencing artifact or derived "
              "from a difference in the molecule (default).")
+    parser.add_argument("-t", "--threads", type=int, default=DEFAULT_THREADS,
+                        help="Number of threads used to (de)compress each "
+                             "compressed input and output file, in addition "
+                             "to the main thread. 0 does the (de)compression "
+                             "in the main thread. Default: 1 if more than one "
+                             "CPU is available, otherwise 0.")
     parser.add_argument("-v", "--verbose", action="count", default=0,
                         help="Increase log verbosity.")
     parser.add_argument("-q", "--quiet", action="count", default=0,
@@ -361,18 +481,18 @@ def argument_parser() -> argparse.ArgumentParser:
     return parser
 
 
+# Strings that denote an omitted slice value.
+_NONE_STRINGS = frozenset(("", "None"))
+
+
 def length_string_to_slices(length_string: str) -> List[slice]:
     """
     Converts a comma-separated string of lengths or slices such as 8,8,8 or
     8:16,8,24:8:-1 to a list of slice objects.
     """
-    parts = length_string.split(",")
-    slices = []
-    for part in parts:
-        values = [None if (x == "None" or x == "") else int(x)
-                  for x in part.split(":")]
-        slices.append(slice(*values))
-    return slices
+    return [slice(*[None if value in _NONE_STRINGS else int(value)
+                    for value in part.split(":")])
+            for part in length_string.split(",")]
 
 
 def main():
@@ -406,7 +526,8 @@ def main():
     deduplicate_cluster(input_files, output_files, check_slices, max_distance,
                         max_average_error_rate,
                         cluster_dissection_func,
-                        use_edit_distance)
+                        use_edit_distance,
+                        args.threads)
     resources = resource.getrusage(resource.RUSAGE_SELF)
     logger.info(f"Finished. Total time: {timer.get_difference()}. "
                 f"Memory usage: {resources.ru_maxrss / (1024 ** 2):.2} GiB")
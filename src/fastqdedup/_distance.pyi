@@ -14,8 +14,19 @@
 # You should have received a copy of the GNU Affero General Public License
 # along with fastqdedup.  If not, see <https://www.gnu.org/licenses/
 
+import sys
+from typing import List, Tuple
+
 def hamming_distance(__string1: str, __string2: str) -> int: ...
 
 def within_distance(__string1: str, __string2: str,
                     max_distance: int,
                     use_edit_distance: bool = False) -> bool: ...
+
+def split_within_distance(
+    __string: str,
+    __items: List[Tuple[int, str]],
+    max_distance: int,
+    use_edit_distance: bool = False,
+    max_count: int = sys.maxsize,
+) -> Tuple[List[Tuple[int, str]], List[Tuple[int, str]]]: ...
@@ -19,6 +19,59 @@
 
 #include "distances.h"
 
+PyDoc_STRVAR(hamming_distance__doc__,
+"hamming_distance($module, string1, string2, /)\n"
+"--\n"
+"\n"
+"Calculates the Hamming distance between two strings.\n"
+"\n"
+"  string1\n"
+"    An ASCII string.\n"
+"  string2\n"
+"    Another ASCII string\n"
+"\n"
+"Returns an integer representing the Hamming distance.\n"
+"Raises a ValueError when strings are not of the same length.\n"
+"\n");
+
+#define HAMMING_DISTANCE_METHODDEF    \
+    {"hamming_distance", (PyCFunction)(void(*)(void))hamming_distance_py, \
+    METH_VARARGS, hamming_distance__doc__}
+
+PyObject *
+hamming_distance_py(PyObject *module, PyObject *args)
+{
+    PyObject *string1 = NULL;
+    PyObject *string2 = NULL;
+    if (!PyArg_ParseTuple(args, "O!O!:hamming_distance",
+                          &PyUnicode_Type, &string1,
+                          &PyUnicode_Type, &string2)) {
+        return NULL;
+    }
+    if (!(PyUnicode_KIND(string1) == PyUnicode_1BYTE_KIND)) {
+        PyErr_SetString(PyExc_ValueError,
+                        "string1 must be ASCII or latin-1 encoded.");
+        return NULL;
+    }
+    if (!(PyUnicode_KIND(string2) == PyUnicode_1BYTE_KIND)) {
+        PyErr_SetString(PyExc_ValueError,
+                        "string2 must be ASCII or latin-1 encoded.");
+        return NULL;
+    }
+    Py_ssize_t string1len = PyUnicode_GET_LENGTH(string1);
+    Py_ssize_t string2len = PyUnicode_GET_LENGTH(string2);
+    if (string1len != string2len) {
+        PyErr_Format(PyExc_ValueError,
+                     "Strings must be of the same length, got %zd and %zd.",
+                     string1len, string2len);
+        return NULL;
+    }
+    size_t distance = hamming_distance(PyUnicode_1BYTE_DATA(string1),
+                                       PyUnicode_1BYTE_DATA(string2),
+                                       string1len);
+    return PyLong_FromSize_t(distance);
+}
+
 
 PyDoc_STRVAR(within_distance__doc__,
 "within_distance($module, string1, string2, /, max_distance, use_edit_distance=False)\n"
@@ -33,10 +86,10 @@ PyDoc_STRVAR(within_distance__doc__,
 "  max_distance\n"
 "     The maximum distance\n"
 "  use_edit_distance\n"
-"    Use edit (Levenshtein) distance instead of Hamming distance"
+"    Use edit (Levenshtein) distance instead of Hamming distance\n"
 "\n"
-"Returns an integer representing the hamming distance.\n"
-"Raises a ValueError when strings are not of the same length.\n"
+"Returns True when the strings are within max_distance of each other.\n"
+"Strings of unequal length are never within Hamming distance.\n"
 "\n");
 
 #define WITHIN_DISTANCE_METHODDEF    \
@@ -93,8 +146,129 @@ within_distance(PyObject *module,
 }
 
 
+PyDoc_STRVAR(split_within_distance__doc__,
+"split_within_distance($module, string, items, /, max_distance, use_edit_distance=False, max_count=sys.maxsize)\n"
+"--\n"
+"\n"
+"Splits items in the items that are within distance of string and the\n"
+"items that are not.\n"
+"\n"
+"  string\n"
+"    An ASCII string.\n"
+"  items\n"
+"    A list of (count, string) tuples.\n"
+"  max_distance\n"
+"     The maximum distance\n"
+"  use_edit_distance\n"
+"    Use edit (Levenshtein) distance instead of Hamming distance\n"
+"  max_count\n"
+"    Only items with a count of at most max_count are tested. Items with\n"
+"    a higher count are never within distance.\n"
+"\n"
+"Returns a tuple of two lists: the items within distance and the other\n"
+"items. Both lists keep the order of items.\n"
+"\n");
+
+#define SPLIT_WITHIN_DISTANCE_METHODDEF    \
+    {"split_within_distance", \
+    (PyCFunction)(void(*)(void))split_within_distance, \
+    METH_VARARGS | METH_KEYWORDS, split_within_distance__doc__}
+
+PyObject *
+split_within_distance(PyObject *module,
+                      PyObject *args,
+                      PyObject *kwargs)
+{
+    PyObject *string = NULL;
+    PyObject *items = NULL;
+    int max_distance = 0;
+    int use_edit_distance = 0;
+    Py_ssize_t max_count = PY_SSIZE_T_MAX;
+    char *keywords[] = {"", "", "max_distance", "use_edit_distance",
+                        "max_count", NULL};
+    char *format = "O!O!i|pn:split_within_distance";
+    if (!PyArg_ParseTupleAndKeywords(
+            args, kwargs, format, keywords,
+            &PyUnicode_Type, &string, &PyList_Type, &items,
+            &max_distance, &use_edit_distance, &max_count)) {
+                return NULL;
+    }
+    if (!(PyUnicode_KIND(string) == PyUnicode_1BYTE_KIND)) {
+        PyErr_SetString(PyExc_ValueError,
+                        "string must be ASCII or latin-1 encoded.");
+        return NULL;
+    }
+    uint8_t *string_chars = PyUnicode_1BYTE_DATA(string);
+    Py_ssize_t string_length = PyUnicode_GET_LENGTH(string);
+
+    PyObject *within = PyList_New(0);
+    PyObject *others = PyList_New(0);
+    if (within == NULL || others == NULL) {
+        goto error;
+    }
+    Py_ssize_t number_of_items = PyList_GET_SIZE(items);
+    for (Py_ssize_t i=0; i < number_of_items; i+=1) {
+        PyObject *item = PyList_GET_ITEM(items, i);
+        if (!(PyTuple_CheckExact(item) && PyTuple_GET_SIZE(item) == 2)) {
+            PyErr_Format(PyExc_TypeError,
+                         "items must be (count, string) tuples, got %R",
+                         item);
+            goto error;
+        }
+        PyObject *count_obj = PyTuple_GET_ITEM(item, 0);
+        PyObject *compare_string = PyTuple_GET_ITEM(item, 1);
+        Py_ssize_t count = PyLong_AsSsize_t(count_obj);
+        if (count == -1 && PyErr_Occurred()) {
+            goto error;
+        }
+        if (!PyUnicode_CheckExact(compare_string)) {
+            PyErr_Format(PyExc_TypeError,
+                         "items must be (count, string) tuples, got %R",
+                         item);
+            goto error;
+        }
+        if (!(PyUnicode_KIND(compare_string) == PyUnicode_1BYTE_KIND)) {
+            PyErr_SetString(PyExc_ValueError,
+                            "strings must be ASCII or latin-1 encoded.");
+            goto error;
+        }
+        int is_within = 0;
+        if (count <= max_count) {
+            uint8_t *compare_chars = PyUnicode_1BYTE_DATA(compare_string);
+            Py_ssize_t compare_length = PyUnicode_GET_LENGTH(compare_string);
+            if (use_edit_distance) {
+                is_within = within_edit_distance(
+                    string_chars, string_length,
+                    compare_chars, compare_length, max_distance);
+            }
+            else {
+                is_within = within_hamming_distance(
+                    string_chars, string_length,
+                    compare_chars, compare_length, max_distance);
+            }
+        }
+        if (PyList_Append(is_within ? within : others, item) < 0) {
+            goto error;
+        }
+    }
+    PyObject *result = PyTuple_New(2);
+    if (result == NULL) {
+        goto error;
+    }
+    PyTuple_SET_ITEM(result, 0, within);
+    PyTuple_SET_ITEM(result, 1, others);
+    return result;
+error:
+    Py_XDECREF(within);
+    Py_XDECREF(others);
+    return NULL;
+}
+
+
 static PyMethodDef _distance_functions[] = {
+    HAMMING_DISTANCE_METHODDEF,
     WITHIN_DISTANCE_METHODDEF,
+    SPLIT_WITHIN_DISTANCE_METHODDEF,
     {NULL}
 };
 
@@ -14,8 +14,13 @@
 # You should have received a copy of the GNU Affero General Public License
 # along with fastqdedup.  If not, see <https://www.gnu.org/licenses/
 
-DEFAULT_PHRED_OFFSET: int 
+from typing import Sequence, Union
+
+DEFAULT_PHRED_OFFSET: int
 
 def average_error_rate(
-    __phred_scores: str, *,
+    __phred_scores: Union[str, Sequence[str]], *,
     phred_offset: int = DEFAULT_PHRED_OFFSET) -> float: ...
+
+def join_slices(__strings: Sequence[str],
+                __slices: Sequence[slice]) -> str: ...
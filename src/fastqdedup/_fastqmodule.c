@@ -21,14 +21,56 @@
 #define MAXIMUM_PHRED_SCORE 126
 #define DEFAULT_PHRED_OFFSET 33
 
-PyDoc_STRVAR(average_error_rate__doc__, 
+/**
+ * @brief Add the error rates of all phred scores in an ASCII string to
+ *        total_error_rate.
+ *
+ * @return 0 on success, -1 on failure with an exception set.
+ */
+static int
+add_error_rates(PyObject *phred_scores, uint8_t phred_offset,
+                double *total_error_rate)
+{
+    if (!PyUnicode_CheckExact(phred_scores)) {
+        PyErr_Format(PyExc_TypeError,
+                     "phred_scores must be a str or a sequence of str, "
+                     "got %s", Py_TYPE(phred_scores)->tp_name);
+        return -1;
+    }
+    if (!PyUnicode_IS_COMPACT_ASCII(phred_scores)) {
+        PyErr_SetString(PyExc_ValueError,
+                        "phred_scores must be ASCII encoded.");
+        return -1;
+    }
+    double error_rate = 0.0;
+    uint8_t *scores = PyUnicode_DATA(phred_scores);
+    uint8_t score;
+    uint8_t max_score = MAXIMUM_PHRED_SCORE - phred_offset;
+    Py_ssize_t length = PyUnicode_GET_LENGTH(phred_scores);
+    for (Py_ssize_t i=0; i<length; i+=1) {
+        score = scores[i] - phred_offset;
+        if (score > max_score) {
+            PyErr_Format(
+                PyExc_ValueError,
+                "Character %c outside of valid phred range ('%c' to '%c')",
+                scores[i], phred_offset, MAXIMUM_PHRED_SCORE);
+            return -1;
+        }
+        error_rate += SCORE_TO_ERROR_RATE[score];
+    }
+    *total_error_rate += error_rate;
+    return 0;
+}
+
+PyDoc_STRVAR(average_error_rate__doc__,
 "average_error_rate($self, phred_scores, /, phred_offset=DEFAULT_PHRED_OFFSET)\n"
 "--\n"
 "\n"
 "Returns the average error rate as a float. \n"
 "\n"
 "  phred_scores\n"
-"    ASCII string with the phred scores.\n"
+"    ASCII string with the phred scores. Can also be a sequence of ASCII\n"
+"    strings, in which case the average over all strings is returned.\n"
 );
 
 #define AVERAGE_ERROR_RATE_METHODDEF    \
@@ -36,47 +78,160 @@ PyDoc_STRVAR(average_error_rate__doc__,
      METH_VARARGS | METH_KEYWORDS, average_error_rate__doc__}
 
 static PyObject *
-average_error_rate(PyObject *module, PyObject *args, PyObject *kwargs) 
+average_error_rate(PyObject *module, PyObject *args, PyObject *kwargs)
 {
     PyObject *phred_scores = NULL;
     uint8_t phred_offset = DEFAULT_PHRED_OFFSET;
     char *kwarg_names[] = {"", "phred_offset", NULL};
-    const char *format = "O!|$b:average_error_rate";
+    const char *format = "O|$b:average_error_rate";
     if (!PyArg_ParseTupleAndKeywords(
-        args, kwargs, format, kwarg_names, 
-        &PyUnicode_Type, 
-        &phred_scores, 
+        args, kwargs, format, kwarg_names,
+        &phred_scores,
         &phred_offset)) {
             return NULL;
     }
 
-    if (!PyUnicode_IS_COMPACT_ASCII(phred_scores)) {
-        PyErr_SetString(PyExc_ValueError, 
-                        "phred_scores must be ASCII encoded.");
-        return NULL;
-    }
     double total_error_rate = 0.0;
-    uint8_t *scores = PyUnicode_DATA(phred_scores);
-    uint8_t score;
-    uint8_t max_score = MAXIMUM_PHRED_SCORE - phred_offset;
-    Py_ssize_t length = PyUnicode_GET_LENGTH(phred_scores);
-    for (Py_ssize_t i=0; i<length; i+=1) {
-        score = scores[i] - phred_offset;
-        if (score > max_score) {
-            PyErr_Format(
-                PyExc_ValueError, 
-                "Character %c outside of valid phred range ('%c' to '%c')",
-                scores[i], phred_offset, MAXIMUM_PHRED_SCORE);
+    Py_ssize_t length = 0;
+    if (PyUnicode_CheckExact(phred_scores)) {
+        if (add_error_rates(phred_scores, phred_offset, &total_error_rate) != 0) {
+            return NULL;
+        }
+        length = PyUnicode_GET_LENGTH(phred_scores);
+    }
+    else {
+        // Iterate over the strings rather than joining them, this saves
+        // creating a temporary string.
+        PyObject *sequence = PySequence_Fast(
+            phred_scores, "phred_scores must be a str or a sequence of str");
+        if (sequence == NULL) {
             return NULL;
         }
-        total_error_rate += SCORE_TO_ERROR_RATE[score];
+        Py_ssize_t number_of_strings = PySequence_Fast_GET_SIZE(sequence);
+        PyObject **strings = PySequence_Fast_ITEMS(sequence);
+        for (Py_ssize_t i=0; i<number_of_strings; i+=1) {
+            if (add_error_rates(strings[i], phred_offset,
+                                &total_error_rate) != 0) {
+                Py_DECREF(sequence);
+                return NULL;
+            }
+            length += PyUnicode_GET_LENGTH(strings[i]);
+        }
+        Py_DECREF(sequence);
     }
     double average_error = total_error_rate / (double)length;
     return PyFloat_FromDouble(average_error);
 }
 
+PyDoc_STRVAR(join_slices__doc__,
+"join_slices($self, strings, slices, /)\n"
+"--\n"
+"\n"
+"Slice each string with the slice at the same position and return the \n"
+"concatenation of the results. Equivalent to \n"
+"``\"\".join(s[slc] for s, slc in zip(strings, slices))``.\n"
+"\n"
+"  strings\n"
+"    A sequence of ASCII strings.\n"
+"  slices\n"
+"    A sequence of slice objects with the same length as strings.\n"
+);
+
+#define JOIN_SLICES_METHODDEF    \
+    {"join_slices", (PyCFunction)(void(*)(void))join_slices, \
+     METH_VARARGS, join_slices__doc__}
+
+static PyObject *
+join_slices(PyObject *module, PyObject *args)
+{
+    PyObject *strings_obj = NULL;
+    PyObject *slices_obj = NULL;
+    if (!PyArg_ParseTuple(args, "OO:join_slices", &strings_obj, &slices_obj)) {
+        return NULL;
+    }
+    PyObject *strings_seq = PySequence_Fast(
+        strings_obj, "strings must be a sequence of str");
+    if (strings_seq == NULL) {
+        return NULL;
+    }
+    PyObject *slices_seq = PySequence_Fast(
+        slices_obj, "slices must be a sequence of slice objects");
+    if (slices_seq == NULL) {
+        Py_DECREF(strings_seq);
+        return NULL;
+    }
+    PyObject *result = NULL;
+    Py_ssize_t number_of_strings = PySequence_Fast_GET_SIZE(strings_seq);
+    PyObject **strings = PySequence_Fast_ITEMS(strings_seq);
+    PyObject **slices = PySequence_Fast_ITEMS(slices_seq);
+    if (number_of_strings != PySequence_Fast_GET_SIZE(slices_seq)) {
+        PyErr_Format(PyExc_ValueError,
+                     "strings and slices must have the same length, "
+                     "got %zd and %zd.",
+                     number_of_strings, PySequence_Fast_GET_SIZE(slices_seq));
+        goto exit;
+    }
+    Py_ssize_t start, stop, step;
+    Py_ssize_t total_length = 0;
+    // Check all arguments and determine the result size first, so the
+    // result can be created at once.
+    for (Py_ssize_t i=0; i<number_of_strings; i+=1) {
+        PyObject *string = strings[i];
+        if (!PyUnicode_CheckExact(string)) {
+            PyErr_Format(PyExc_TypeError,
+                         "strings must be a sequence of str, got %s",
+                         Py_TYPE(string)->tp_name);
+            goto exit;
+        }
+        if (!PyUnicode_IS_COMPACT_ASCII(string)) {
+            PyErr_SetString(PyExc_ValueError,
+                            "strings must be ASCII encoded.");
+            goto exit;
+        }
+        if (!PySlice_Check(slices[i])) {
+            PyErr_Format(PyExc_TypeError,
+                         "slices must be a sequence of slice objects, got %s",
+                         Py_TYPE(slices[i])->tp_name);
+            goto exit;
+        }
+        if (PySlice_Unpack(slices[i], &start, &stop, &step) < 0) {
+            goto exit;
+        }
+        total_length += PySlice_AdjustIndices(
+            PyUnicode_GET_LENGTH(string), &start, &stop, step);
+    }
+    result = PyUnicode_New(total_length, 127);
+    if (result == NULL) {
+        goto exit;
+    }
+    uint8_t *result_ptr = PyUnicode_DATA(result);
+    for (Py_ssize_t i=0; i<number_of_strings; i+=1) {
+        PyObject *string = strings[i];
+        uint8_t *string_ptr = PyUnicode_DATA(string);
+        PySlice_Unpack(slices[i], &start, &stop, &step);
+        Py_ssize_t slice_length = PySlice_AdjustIndices(
+            PyUnicode_GET_LENGTH(string), &start, &stop, step);
+        if (step == 1) {
+            memcpy(result_ptr, string_ptr + start, slice_length);
+            result_ptr += slice_length;
+        }
+        else {
+            for (Py_ssize_t j=0; j<slice_length; j+=1) {
+                result_ptr[0] = string_ptr[start];
+                result_ptr += 1;
+                start += step;
+            }
+        }
+    }
+exit:
+    Py_DECREF(strings_seq);
+    Py_DECREF(slices_seq);
+    return result;
+}
+
 static PyMethodDef _fastq_functions[] = {
     AVERAGE_ERROR_RATE_METHODDEF,
+    JOIN_SLICES_METHODDEF,
     {NULL}
 };
 
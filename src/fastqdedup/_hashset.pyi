@@ -0,0 +1,26 @@
+# Copyright (C) 2022 Leiden University Medical Center
+# This file is part of fastqdedup
+#
+# fastqdedup is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# fastqdedup is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with fastqdedup.  If not, see <https://www.gnu.org/licenses/
+
+class HashSet:
+    def __init__(self): ...
+
+    def add(self, __hash: int): ...
+
+    def remove(self, __hash: int): ...
+
+    def __contains__(self, __hash: int) -> bool: ...
+
+    def __len__(self) -> int: ...
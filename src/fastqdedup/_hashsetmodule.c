@@ -0,0 +1,331 @@
+// Copyright (C) 2022 Leiden University Medical Center
+// This file is part of fastqdedup
+//
+// fastqdedup is free software: you can redistribute it and/or modify
+// it under the terms of the GNU Affero General Public License as
+// published by the Free Software Foundation, either version 3 of the
+// License, or (at your option) any later version.
+//
+// fastqdedup is distributed in the hope that it will be useful,
+// but WITHOUT ANY WARRANTY; without even the implied warranty of
+// MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+// GNU Affero General Public License for more details.
+//
+// You should have received a copy of the GNU Affero General Public License
+// along with fastqdedup.  If not, see <https://www.gnu.org/licenses/
+
+#define PY_SSIZE_T_CLEAN
+#include <Python.h>
+#include <stdint.h>
+
+#define HASHSET_MINIMUM_SIZE 64
+// Values that mark empty and deleted slots in the table. When these values
+// are added to the set, this is stored in a flag instead.
+#define HASHSET_EMPTY 0
+#define HASHSET_DELETED -1
+
+/**
+ * @brief A set of 64-bit hashes.
+ *
+ * A Python set of integers costs about 60 bytes per hash, as each hash is
+ * stored in an int object that is referenced from the hash table. Here the
+ * hashes are stored directly in an open addressing hash table of int64_t,
+ * which costs 11 to 21 bytes per hash depending on the fill.
+ *
+ * Collisions are resolved with linear probing. The table is kept at most
+ * three quarters full. Removed hashes leave a HASHSET_DELETED marker so
+ * probing continues past them. The markers are purged when the table is
+ * resized.
+ */
+typedef struct {
+    PyObject_HEAD
+    int64_t *table;
+    size_t table_size;
+    int shift;
+    Py_ssize_t used;
+    Py_ssize_t filled;
+    int has_empty;
+    int has_deleted;
+} HashSet;
+
+/**
+ * @brief Get the start index for a hash. Multiplying by 2^64 divided by the
+ *        golden ratio spreads the bits, so sequential values do not end up
+ *        in sequential slots.
+ */
+static inline size_t
+HashSet_StartIndex(HashSet *self, int64_t hash) {
+    return (size_t)(((uint64_t)hash * 0x9E3779B97F4A7C15ULL) >> self->shift);
+}
+
+/**
+ * @brief Return the index of hash in the table or -1 if not present.
+ */
+static Py_ssize_t
+HashSet_Find(HashSet *self, int64_t hash) {
+    if (self->table == NULL) {
+        return -1;
+    }
+    size_t mask = self->table_size - 1;
+    size_t index = HashSet_StartIndex(self, hash);
+    int64_t *table = self->table;
+    while (1) {
+        int64_t value = table[index];
+        if (value == hash) {
+            return index;
+        }
+        if (value == HASHSET_EMPTY) {
+            return -1;
+        }
+        index = (index + 1) & mask;
+    }
+}
+
+/**
+ * @brief Move all hashes into a new table, purging the deleted markers. The
+ *        new table is at most half full.
+ *
+ * @return 0 on success, -1 on failure with an exception set.
+ */
+static int
+HashSet_Resize(HashSet *self) {
+    size_t new_size = HASHSET_MINIMUM_SIZE;
+    int shift = 64 - 6;
+    while ((size_t)(self->used + 1) * 2 > new_size) {
+        new_size *= 2;
+        shift -= 1;
+    }
+    int64_t *new_table = PyMem_Calloc(new_size, sizeof(int64_t));
+    if (new_table == NULL) {
+        PyErr_NoMemory();
+        return -1;
+    }
+    int64_t *old_table = self->table;
+    size_t old_size = self->table_size;
+    self->table = new_table;
+    self->table_size = new_size;
+    self->shift = shift;
+    size_t mask = new_size - 1;
+    for (size_t i=0; i < old_size; i+=1) {
+        int64_t hash = old_table[i];
+        if (hash == HASHSET_EMPTY || hash == HASHSET_DELETED) {
+            continue;
+        }
+        size_t index = HashSet_StartIndex(self, hash);
+        while (new_table[index] != HASHSET_EMPTY) {
+            index = (index + 1) & mask;
+        }
+        new_table[index] = hash;
+    }
+    PyMem_Free(old_table);
+    self->filled = self->used;
+    return 0;
+}
+
+/**
+ * @brief Add a hash to the set.
+ *
+ * @return 1 if the hash was added, 0 if it was already present, -1 on
+ *         failure with an exception set.
+ */
+static int
+HashSet_Add(HashSet *self, int64_t hash) {
+    if (hash == HASHSET_EMPTY || hash == HASHSET_DELETED) {
+        int *flag = (hash == HASHSET_EMPTY) ? &self->has_empty : &self->has_deleted;
+        int added = !*flag;
+        *flag = 1;
+        return added;
+    }
+    if ((size_t)(self->filled + 1) * 4 > self->table_size * 3) {
+        if (HashSet_Resize(self) != 0) {
+            return -1;
+        }
+    }
+    size_t mask = self->table_size - 1;
+    size_t index = HashSet_StartIndex(self, hash);
+    int64_t *table = self->table;
+    Py_ssize_t deleted_index = -1;
+    while (1) {
+        int64_t value = table[index];
+        if (value == hash) {
+            return 0;
+        }
+        if (value == HASHSET_EMPTY) {
+            break;
+        }
+        if (value == HASHSET_DELETED && deleted_index == -1) {
+            deleted_index = index;
+        }
+        index = (index + 1) & mask;
+    }
+    if (deleted_index != -1) {
+        // Reuse the slot of a removed hash.
+        table[deleted_index] = hash;
+    }
+    else {
+        table[index] = hash;
+        self->filled += 1;
+    }
+    self->used += 1;
+    return 1;
+}
+
+static void
+HashSet_Dealloc(HashSet *self) {
+    PyMem_Free(self->table);
+    Py_TYPE(self)->tp_free((PyObject *)self);
+}
+
+static PyObject *
+HashSet__new__(PyTypeObject *type, PyObject *args, PyObject *kwargs) {
+    char *keywords[] = {NULL};
+    const char *format = ":HashSet.__new__";
+    if (!PyArg_ParseTupleAndKeywords(args, kwargs, format, keywords)) {
+        return NULL;
+    }
+    HashSet *self = PyObject_New(HashSet, type);
+    if (self == NULL) {
+        return NULL;
+    }
+    self->table = NULL;
+    self->table_size = 0;
+    self->shift = 64;
+    self->used = 0;
+    self->filled = 0;
+    self->has_empty = 0;
+    self->has_deleted = 0;
+    return (PyObject *)self;
+}
+
+PyDoc_STRVAR(HashSet_add__doc__,
+"add($self, hash, /)\n"
+"--\n"
+"\n"
+"Adds a hash to the set.\n"
+"\n"
+"  hash\n"
+"    An integer that fits in 64 bits, such as the result of hash().\n"
+"\n");
+
+#define HASHSET_ADD_METHODDEF    \
+    {"add", (PyCFunction)(void(*)(void))HashSet_add, METH_O, \
+     HashSet_add__doc__}
+
+static PyObject *
+HashSet_add(HashSet *self, PyObject *hash_obj) {
+    int64_t hash = PyLong_AsLongLong(hash_obj);
+    if (hash == -1 && PyErr_Occurred()) {
+        return NULL;
+    }
+    if (HashSet_Add(self, hash) < 0) {
+        return NULL;
+    }
+    Py_RETURN_NONE;
+}
+
+PyDoc_STRVAR(HashSet_remove__doc__,
+"remove($self, hash, /)\n"
+"--\n"
+"\n"
+"Removes a hash from the set. Raises a KeyError if it is not present.\n"
+"\n"
+"  hash\n"
+"    An integer that fits in 64 bits, such as the result of hash().\n"
+"\n");
+
+#define HASHSET_REMOVE_METHODDEF    \
+    {"remove", (PyCFunction)(void(*)(void))HashSet_remove, METH_O, \
+     HashSet_remove__doc__}
+
+static PyObject *
+HashSet_remove(HashSet *self, PyObject *hash_obj) {
+    int64_t hash = PyLong_AsLongLong(hash_obj);
+    if (hash == -1 && PyErr_Occurred()) {
+        return NULL;
+    }
+    if (hash == HASHSET_EMPTY || hash == HASHSET_DELETED) {
+        int *flag = (hash == HASHSET_EMPTY) ? &self->has_empty : &self->has_deleted;
+        if (!*flag) {
+            PyErr_SetObject(PyExc_KeyError, hash_obj);
+            return NULL;
+        }
+        *flag = 0;
+        Py_RETURN_NONE;
+    }
+    Py_ssize_t index = HashSet_Find(self, hash);
+    if (index == -1) {
+        PyErr_SetObject(PyExc_KeyError, hash_obj);
+        return NULL;
+    }
+    self->table[index] = HASHSET_DELETED;
+    self->used -= 1;
+    Py_RETURN_NONE;
+}
+
+static int
+HashSet__contains__(HashSet *self, PyObject *hash_obj) {
+    int64_t hash = PyLong_AsLongLong(hash_obj);
+    if (hash == -1 && PyErr_Occurred()) {
+        return -1;
+    }
+    if (hash == HASHSET_EMPTY) {
+        return self->has_empty;
+    }
+    if (hash == HASHSET_DELETED) {
+        return self->has_deleted;
+    }
+    return HashSet_Find(self, hash) != -1;
+}
+
+static Py_ssize_t
+HashSet__len__(HashSet *self) {
+    return self->used + self->has_empty + self->has_deleted;
+}
+
+static PyMethodDef HashSet_methods[] = {
+    HASHSET_ADD_METHODDEF,
+    HASHSET_REMOVE_METHODDEF,
+    {NULL}
+};
+
+static PySequenceMethods HashSet_as_sequence = {
+    .sq_length = (lenfunc)HashSet__len__,
+    .sq_contains = (objobjproc)HashSet__contains__,
+};
+
+static PyTypeObject HashSet_Type = {
+    PyVarObject_HEAD_INIT(NULL, 0)
+    .tp_name = "_hashset.HashSet",
+    .tp_basicsize = sizeof(HashSet),
+    .tp_dealloc = (destructor)HashSet_Dealloc,
+    .tp_new = HashSet__new__,
+    .tp_methods = HashSet_methods,
+    .tp_as_sequence = &HashSet_as_sequence,
+};
+
+
+static struct PyModuleDef _hashset_module = {
+    PyModuleDef_HEAD_INIT,
+    "_hashset",   /* name of module */
+    NULL, /* module documentation, may be NULL */
+    -1,
+    NULL  /* module methods */
+};
+
+PyMODINIT_FUNC
+PyInit__hashset(void)
+{
+    PyObject *m;
+
+    m = PyModule_Create(&_hashset_module);
+    if (m == NULL)
+        return NULL;
+
+    if (PyType_Ready(&HashSet_Type) < 0)
+        return NULL;
+    PyObject *HashSetType = (PyObject *)&HashSet_Type;
+    Py_INCREF(HashSetType);
+    if (PyModule_AddObject(m, "HashSet", HashSetType) < 0)
+        return NULL;
+    return m;
+}
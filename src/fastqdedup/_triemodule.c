@@ -66,6 +66,22 @@ Alphabet_InitializeFromString(Alphabet *alphabet, uint8_t *string) {
 
 }
 
+/**
+ * @brief Get the index of a character. The character is added to the
+ *        alphabet if it is not present yet.
+ */
+static inline uint8_t
+Alphabet_GetOrAddIndex(Alphabet *alphabet, uint8_t character) {
+    uint8_t index = alphabet->to_index[character];
+    if (index == 255) { // Letter not present in the alphabet. Add it.
+        index = alphabet->size;
+        alphabet->to_index[character] = index;
+        alphabet->from_index[index] = character;
+        alphabet->size = index + 1;
+    }
+    return index;
+}
+
 /**
  * @brief A node in a trie.
  * 
@@ -205,11 +221,31 @@ TrieNode_NewLeaf(uint8_t *suffix, uint32_t suffix_size, uint32_t sequence_count)
     return new;
 }
 
+/**
+ * @brief Check whether adding sequence_count to the count of trie_node
+ *        exceeds the maximum count.
+ *
+ * @return 1 with an OverflowError set if it does, 0 otherwise.
+ */
+static inline int
+TrieNode_CountOverflows(TrieNode *trie_node, uint32_t sequence_count) {
+    if (trie_node->count > UINT32_MAX - sequence_count) {
+        PyErr_Format(PyExc_OverflowError,
+                     "Sequence count can not exceed %lu",
+                     (unsigned long)UINT32_MAX);
+        return 1;
+    }
+    return 0;
+}
+
 /**
  * @brief Add a sequence to the TrieNode at the trie_node_address. May resize
  *        the TrieNode accordingly.
- * 
- * @param trie_node_address Pointer to a TrieNode pointer. 
+ *
+ * The trie is descended in a loop rather than by recursion, so each
+ * character costs one lookup in the alphabet and one load of a child pointer.
+ *
+ * @param trie_node_address Pointer to a TrieNode pointer.
  * @param sequence The sequence to add.
  * @param sequence_size The size of the sequence.
  * @param sequence_count How many sequence should be added.
@@ -219,69 +255,117 @@ TrieNode_NewLeaf(uint8_t *suffix, uint32_t suffix_size, uint32_t sequence_count)
  */
 static int
 TrieNode_AddSequence(TrieNode **trie_node_address,
-                     uint8_t *sequence, 
-                     uint32_t sequence_size, 
+                     uint8_t *sequence,
+                     uint32_t sequence_size,
                      uint32_t sequence_count,
                      Alphabet *alphabet) {
-    TrieNode *this_node = trie_node_address[0];
-    if (this_node == NULL) {
-        trie_node_address[0] = TrieNode_NewLeaf(sequence, sequence_size, sequence_count);
-        return 0;
-    }
-    if (TrieNode_IS_TERMINAL(this_node)) {
-        uint32_t suffix_size = TrieNode_GET_SUFFIX_SIZE(this_node);
-        if (sequence_size == suffix_size) {
-            if (memcmp(TrieNode_GET_SUFFIX(this_node), sequence, sequence_size) == 0){
-                this_node->count += sequence_count;
-                return 0;
+    TrieNode *this_node;
+    uint8_t node_index;
+    while (1) {
+        this_node = trie_node_address[0];
+        if (this_node == NULL) {
+            this_node = TrieNode_NewLeaf(sequence, sequence_size, sequence_count);
+            if (this_node == NULL) {
+                return -1;
             }
+            trie_node_address[0] = this_node;
+            return 0;
         }
-        // Store the suffix in a temporary space and add  it to this node.
-        uint8_t *suffix = TrieNode_GET_SUFFIX(this_node);
-        uint8_t *tmp = PyMem_Malloc(suffix_size);
-        if (tmp == NULL) {
-            PyErr_NoMemory();
-            return -1;
+        if (TrieNode_IS_TERMINAL(this_node)) {
+            uint32_t suffix_size = TrieNode_GET_SUFFIX_SIZE(this_node);
+            if (sequence_size == suffix_size) {
+                if (memcmp(TrieNode_GET_SUFFIX(this_node), sequence, sequence_size) == 0){
+                    if (TrieNode_CountOverflows(this_node, sequence_count)) {
+                        return -1;
+                    }
+                    this_node->count += sequence_count;
+                    return 0;
+                }
+            }
+            // Split the leaf. Only the part of the suffix after the prefix it
+            // shares with the sequence needs to be copied into a new leaf.
+            uint8_t *suffix = TrieNode_GET_SUFFIX(this_node);
+            uint32_t suffix_count = this_node->count;
+            uint32_t common_size = 0;
+            uint32_t min_size = Py_MIN(suffix_size, sequence_size);
+            while (common_size < min_size && 
+                   suffix[common_size] == sequence[common_size]) {
+                common_size += 1;
+            }
+            TrieNode *suffix_leaf = NULL;
+            uint8_t suffix_character = 0;
+            if (common_size < suffix_size) {
+                suffix_character = suffix[common_size];
+                suffix_leaf = TrieNode_NewLeaf(suffix + common_size + 1,
+                                               suffix_size - common_size - 1,
+                                               suffix_count);
+                if (suffix_leaf == NULL) {
+                    return -1;
+                }
+            }
+            // The memory of the leaf is reused for the first non-terminal node.
+            this_node->alphabet_size = 0;
+            this_node->count = 0;
+            // Create a chain of nodes for the shared prefix.
+            while (common_size > 0) {
+                node_index = Alphabet_GetOrAddIndex(alphabet, sequence[0]);
+                TrieNode *new_node = TrieNode_Resize(this_node, node_index + 1);
+                if (new_node == NULL) {
+                    PyMem_Free(suffix_leaf);
+                    return -1;
+                }
+                trie_node_address[0] = new_node;
+                TrieNode *child = PyMem_Malloc(sizeof(TrieNode));
+                if (child == NULL) {
+                    PyErr_NoMemory();
+                    PyMem_Free(suffix_leaf);
+                    return -1;
+                }
+                child->alphabet_size = 0;
+                child->count = 0;
+                new_node->children[node_index] = child;
+                trie_node_address = (TrieNode **)&(new_node->children[node_index]);
+                this_node = child;
+                sequence += 1;
+                sequence_size -= 1;
+                common_size -= 1;
+            }
+            if (suffix_leaf == NULL) {
+                this_node->count = suffix_count;
+            } else {
+                node_index = Alphabet_GetOrAddIndex(alphabet, suffix_character);
+                TrieNode *new_node = TrieNode_Resize(this_node, node_index + 1);
+                if (new_node == NULL) {
+                    PyMem_Free(suffix_leaf);
+                    return -1;
+                }
+                this_node = new_node;
+                trie_node_address[0] = this_node;
+                this_node->children[node_index] = suffix_leaf;
+            }
         }
-        memcpy(tmp, suffix, suffix_size);
-        this_node->alphabet_size = 0;
-        uint32_t count = this_node->count;
-        this_node->count = 0;
-        int ret = TrieNode_AddSequence(
-            trie_node_address, tmp, suffix_size, count, alphabet);
-        this_node = trie_node_address[0];
-        PyMem_Free(tmp);
-        if (ret != 0){
-            return ret;
+        if (sequence_size == 0) {
+            if (TrieNode_CountOverflows(this_node, sequence_count)) {
+                return -1;
+            }
+            this_node->count += sequence_count;
+            return 0;
         }
-    }
-    if (sequence_size == 0) {
-        this_node->count += sequence_count;
-        return 0;
-    }
 
-    uint8_t character = sequence[0];
-    uint8_t node_index = alphabet->to_index[character];
-    if (node_index == 255) { // Letter not present in the alphabet. Add it.
-        node_index = alphabet->size;
-        alphabet->to_index[character] = node_index;
-        alphabet->from_index[node_index] = character;
-        alphabet->size = node_index + 1;
-    }
+        node_index = Alphabet_GetOrAddIndex(alphabet, sequence[0]);
 
-    if (node_index >= this_node->alphabet_size) {
-        TrieNode *new_node = TrieNode_Resize(this_node, node_index + 1);
-        if (new_node == NULL) {
-            return -1;
+        if (node_index >= this_node->alphabet_size) {
+            TrieNode *new_node = TrieNode_Resize(this_node, node_index + 1);
+            if (new_node == NULL) {
+                return -1;
+            }
+            this_node = new_node;
+            trie_node_address[0] = this_node;
         }
-        this_node = new_node;
-        trie_node_address[0] = this_node;
+        trie_node_address = (TrieNode **)&(this_node->children[node_index]);
+        sequence += 1;
+        sequence_size -= 1;
     }
-    return TrieNode_AddSequence((TrieNode **)&(this_node->children[node_index]), 
-                                 sequence + 1, 
-                                 sequence_size - 1, 
-                                 sequence_count,
-                                 alphabet);
 }
 
 /**
@@ -302,61 +386,76 @@ TrieNode_DeleteSequence(
     uint32_t sequence_size,
     Alphabet *alphabet)
 {
+    // Removing the sequence empties a chain of nodes that have no count and
+    // no other children. Keep track of the link to the top of that chain and
+    // the node above it, which is the deepest node that remains.
+    TrieNode **chain_address = trie_node_address;
+    uint32_t chain_depth = 0;
+    TrieNode *remaining_node = NULL;
     TrieNode *this_node = trie_node_address[0];
-    uint32_t count;
-    if (TrieNode_IS_TERMINAL(this_node)) {
-        uint32_t suffix_size = TrieNode_GET_SUFFIX_SIZE(this_node);
-        if (!(sequence_size == suffix_size)) {
+    uint32_t depth = 0;
+    while (!TrieNode_IS_TERMINAL(this_node)) {
+        if (depth == sequence_size) {
+            // The sequence ends in a node with children. No pruning needed.
+            uint32_t count = this_node->count;
+            this_node->count = 0;
+            return count;
+        }
+        uint8_t node_index = alphabet->to_index[sequence[depth]];
+        if (node_index == 255) {
             return 0;
         }
-        if (!memcmp(TrieNode_GET_SUFFIX(this_node), sequence, sequence_size) == 0){
+        TrieNode *next_node = TrieNode_GetChild(this_node, node_index);
+        if (next_node == NULL) {
             return 0;
         }
-        count = this_node->count;
-        PyMem_Free(this_node);
-        *trie_node_address = NULL;
-        return count;
+        int keep_node = this_node->count != 0;
+        for (uint32_t i=0; i < this_node->alphabet_size && !keep_node; i+=1) {
+            keep_node = (i != node_index && TrieNode_GET_CHILD(this_node, i) != NULL);
+        }
+        if (keep_node) {
+            chain_address = (TrieNode **)&(this_node->children[node_index]);
+            chain_depth = depth + 1;
+            remaining_node = this_node;
+        }
+        this_node = next_node;
+        depth += 1;
     }
-
-    if (sequence_size == 0) {
-        uint32_t count = this_node->count;
-        this_node->count = 0;
-        return count;
+    uint32_t suffix_size = TrieNode_GET_SUFFIX_SIZE(this_node);
+    if (sequence_size - depth != suffix_size) {
+        return 0;
     }
-
-    uint8_t character = sequence[0];
-    uint8_t node_index = alphabet->to_index[character];
-    if (node_index == 255) {
+    if (memcmp(TrieNode_GET_SUFFIX(this_node), sequence + depth, suffix_size) != 0) {
         return 0;
     }
+    uint32_t count = this_node->count;
 
-    TrieNode *next_node = TrieNode_GetChild(this_node, node_index);
-    if (next_node == NULL) {
-        return 0;
+    // Free the chain so there are no dead-end nodes that will mess up the
+    // search algorithms.
+    TrieNode *chain_node = chain_address[0];
+    chain_address[0] = NULL;
+    depth = chain_depth;
+    while (!TrieNode_IS_TERMINAL(chain_node)) {
+        TrieNode *next_node = TrieNode_GET_CHILD(
+            chain_node, alphabet->to_index[sequence[depth]]);
+        PyMem_Free(chain_node);
+        chain_node = next_node;
+        depth += 1;
     }
-    uint32_t ret = TrieNode_DeleteSequence(
-        (TrieNode **)&(this_node->children[node_index]), 
-        sequence + 1, sequence_size - 1, alphabet);
-    
-    // Make sure the tree is properly pruned so there are no dead-end nodes
-    // that will mess up the search algorithms. 
-    if (ret) {
-        for (size_t i=0; i < this_node->alphabet_size; i+=1) {
-            if (TrieNode_GET_CHILD(this_node, i) != NULL) {
-                return ret;
+    PyMem_Free(chain_node);
+
+    if (remaining_node != NULL) {
+        for (size_t i=0; i < remaining_node->alphabet_size; i+=1) {
+            if (TrieNode_GET_CHILD(remaining_node, i) != NULL) {
+                return count;
             }
         }
-        // All children are NULL. If the node has a count it can be converted
-        // into a leave node. If not, it can be freed to.
-        if (this_node->count) {
-            trie_node_address[0] = TrieNode_NewLeaf(NULL, 0, this_node->count);
-        }
-        else {
-            trie_node_address[0] = NULL;
-        }
-        PyMem_Free(this_node);
+        // All children are NULL, so the node was kept for its count. A leaf
+        // without a suffix fits in the memory of any node, so it is
+        // converted in place. This saves an allocation and a free.
+        _TrieNode_SET_SUFFIX_SIZE(remaining_node, 0);
     }
-    return ret;
+    return count;
 }
 
 /**
@@ -511,40 +610,40 @@ TrieNode_GetSequence(
     uint8_t *buffer, 
     uint32_t buffer_size) 
 {
-    if (TrieNode_IS_TERMINAL(trie_node)) {
-        uint32_t suffix_size = TrieNode_GET_SUFFIX_SIZE(trie_node);
-        if (suffix_size > buffer_size) {
+    ssize_t sequence_size = 0;
+    while (!TrieNode_IS_TERMINAL(trie_node)) {
+        // Node has children but we cannot add these to the buffer anymore.
+        if (buffer_size < 1) {
             return -1;
         }
-        uint8_t *suffix = TrieNode_GET_SUFFIX(trie_node);
-        memcpy(buffer, suffix, suffix_size);
-        return suffix_size;
-    }
-    // Node has children but we cannot add these to the buffer anymore.
-    if (buffer_size < 1) {
-        return -1;
-    }
-    uint32_t alphabet_size = trie_node->alphabet_size;
-    uint32_t i;
-    TrieNode *child;
-    for (i=0; i<alphabet_size; i+=1) {
-        child = TrieNode_GET_CHILD(trie_node, i);
+        TrieNode *child = NULL;
+        uint32_t i;
+        for (i=0; i<trie_node->alphabet_size; i+=1) {
+            child = TrieNode_GET_CHILD(trie_node, i);
+            if (child != NULL) {
+                break;
+            }
+        }
         if (child == NULL) {
-            continue;
+            // No children found. Fail when the node count is 0 so this does
+            // not store a sequence.
+            if (trie_node->count > 0) {
+                return sequence_size;
+            }
+            return -1;
         }
         buffer[0] = alphabet->from_index[i];
-        ssize_t ret = TrieNode_GetSequence(child, alphabet, buffer + 1, buffer_size - 1);
-        if (ret == -1) {
-            return ret;
-        }
-        return 1 + ret;
+        buffer += 1;
+        buffer_size -= 1;
+        sequence_size += 1;
+        trie_node = child;
     }
-    // No children found.
-    if (trie_node->count > 0) {
-        return 0;
+    uint32_t suffix_size = TrieNode_GET_SUFFIX_SIZE(trie_node);
+    if (suffix_size > buffer_size) {
+        return -1;
     }
-    // Fail when the node count is 0 so this does not store a sequence.
-    return -1;
+    memcpy(buffer, TrieNode_GET_SUFFIX(trie_node), suffix_size);
+    return sequence_size + suffix_size;
 }
 
 static size_t 
@@ -676,12 +775,12 @@ PyDoc_STRVAR(Trie_add_sequence__doc__,
 static PyObject *
 Trie_add_sequence(Trie *self, PyObject *sequence) {
     if (!PyUnicode_CheckExact(sequence)) {
-        PyErr_Format(PyExc_TypeError, "Sequence must be a str, got %s", 
+        PyErr_Format(PyExc_TypeError, "Sequence must be a str, got %s",
             Py_TYPE(sequence)->tp_name);
         return NULL;
     }
     if (!PyUnicode_IS_COMPACT_ASCII(sequence)) {
-        PyErr_SetString(PyExc_ValueError, 
+        PyErr_SetString(PyExc_ValueError,
                         "Sequence must consist only of ASCII characters");
         return NULL;
     }
@@ -689,7 +788,7 @@ Trie_add_sequence(Trie *self, PyObject *sequence) {
     Py_ssize_t seq_size = PyUnicode_GET_LENGTH(sequence);
     if (seq_size > TRIE_NODE_SUFFIX_MAX_SIZE) {
         PyErr_Format(
-            PyExc_ValueError, 
+            PyExc_ValueError,
             "Sequences larger than %d can not be stored in the Trie",
             TRIE_NODE_SUFFIX_MAX_SIZE);
         return NULL;
@@ -756,6 +855,29 @@ Trie_contains_sequence(Trie *self, PyObject *args, PyObject* kwargs) {
     return PyBool_FromLong(ret > -1);
 }
 
+/**
+ * @brief Create a (count, sequence) tuple. Steals the reference to sequence.
+ *
+ * @return A new reference or NULL on failure with an exception set.
+ */
+static PyObject *
+CountSequenceTuple(uint32_t count, PyObject *sequence) {
+    PyObject *count_obj = PyLong_FromUnsignedLong(count);
+    if (count_obj == NULL) {
+        Py_DECREF(sequence);
+        return NULL;
+    }
+    PyObject *tup = PyTuple_New(2);
+    if (tup == NULL) {
+        Py_DECREF(count_obj);
+        Py_DECREF(sequence);
+        return NULL;
+    }
+    PyTuple_SET_ITEM(tup, 0, count_obj);
+    PyTuple_SET_ITEM(tup, 1, sequence);
+    return tup;
+}
+
 PyDoc_STRVAR(Trie_pop_cluster__doc__,
 "pop_cluster($self, max_distance, use_edit_distance=False /)\n"
 "--\n"
@@ -818,7 +940,7 @@ Trie_pop_cluster(Trie *self, PyObject *args, PyObject *kwargs)
     // PyUnicode_New + memcpy is faster than PyUnicode_DecodeXXXX family.
     PyObject *first_sequence_obj = PyUnicode_New(sequence_size, 127);
     if (first_sequence_obj == NULL) {
-        return PyErr_NoMemory();
+        return NULL;
     }
     memcpy(PyUnicode_DATA(first_sequence_obj), buffer, sequence_size);
 
@@ -835,10 +957,15 @@ Trie_pop_cluster(Trie *self, PyObject *args, PyObject *kwargs)
     }
     self->number_of_sequences -= template_count;
     // Initiate a cluster from the obtained sequence.
+    PyObject *tup = CountSequenceTuple(template_count, first_sequence_obj);
+    if (tup == NULL) {
+        return NULL;
+    }
     PyObject *cluster = PyList_New(1);
-    PyObject *tup = PyTuple_New(2);
-    PyTuple_SET_ITEM(tup, 0, PyLong_FromSsize_t(template_count));
-    PyTuple_SET_ITEM(tup, 1, first_sequence_obj);
+    if (cluster == NULL) {
+        Py_DECREF(tup);
+        return NULL;
+    }
     PyList_SET_ITEM(cluster, 0, tup);
     if (max_distance == 0) {
         return cluster;
@@ -870,6 +997,10 @@ Trie_pop_cluster(Trie *self, PyObject *args, PyObject *kwargs)
             max_distance, &(self->alphabet), buffer, use_edit_distance);
         if (sequence_size > -1) {
             sequence = PyUnicode_New(sequence_size, 127);
+            if (sequence == NULL) {
+                Py_DECREF(cluster);
+                return NULL;
+            }
             memcpy(PyUnicode_DATA(sequence), buffer, sequence_size);
             deleted_count = TrieNode_DeleteSequence(&(self->root), buffer,
                                           sequence_size, &(self->alphabet));
@@ -880,10 +1011,18 @@ Trie_pop_cluster(Trie *self, PyObject *args, PyObject *kwargs)
                 return NULL;
             }
             self->number_of_sequences -= deleted_count;
-            tup = PyTuple_New(2);
-            PyTuple_SET_ITEM(tup, 0, PyLong_FromUnsignedLong(deleted_count));
-            PyTuple_SET_ITEM(tup, 1, sequence);
-            PyList_Append(cluster, tup);
+            tup = CountSequenceTuple(deleted_count, sequence);
+            if (tup == NULL) {
+                Py_DECREF(cluster);
+                return NULL;
+            }
+            int ret = PyList_Append(cluster, tup);
+            // PyList_Append does not steal the reference.
+            Py_DECREF(tup);
+            if (ret != 0) {
+                Py_DECREF(cluster);
+                return NULL;
+            }
             cluster_size += 1;
         }
         else {
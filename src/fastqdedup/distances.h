@@ -4,8 +4,78 @@
 #ifndef size_t
 #include <stddef.h>
 #endif
+#include <stdlib.h>
+#include <string.h>
 
-static int 
+#if defined(__SSE2__) && defined(__GNUC__)
+#include <emmintrin.h>
+#define DISTANCES_USE_SSE2 1
+
+/**
+ * @brief Count the number of bytes that differ between two 16-byte blocks.
+ *
+ * The bytes are compared all at once. The comparison results are
+ * gathered in a 16-bit mask with one bit for each equal byte.
+ */
+static inline int
+block_mismatches(const uint8_t *block1, const uint8_t *block2)
+{
+    __m128i vector1 = _mm_loadu_si128((const __m128i *)block1);
+    __m128i vector2 = _mm_loadu_si128((const __m128i *)block2);
+    int equal_mask = _mm_movemask_epi8(_mm_cmpeq_epi8(vector1, vector2));
+    return 16 - __builtin_popcount(equal_mask);
+}
+#endif
+
+/**
+ * @brief Count the number of bytes that differ between two 64-bit words
+ *        without branching.
+ */
+static inline int
+word_mismatches(uint64_t word1, uint64_t word2)
+{
+    uint64_t difference = word1 ^ word2;
+    // Fold all the bits of each byte onto the lowest bit of the byte.
+    difference |= difference >> 4;
+    difference |= difference >> 2;
+    difference |= difference >> 1;
+    difference &= 0x0101010101010101ULL;
+    // The multiplication sums all bytes into the highest byte.
+    return (int)((difference * 0x0101010101010101ULL) >> 56);
+}
+
+/**
+ * @brief Calculate the Hamming distance between two strings of equal length.
+ */
+static inline size_t
+hamming_distance(
+    const uint8_t *string1,
+    const uint8_t *string2,
+    size_t length)
+{
+    size_t distance = 0;
+    size_t i = 0;
+    uint64_t word1;
+    uint64_t word2;
+#ifdef DISTANCES_USE_SSE2
+    while (i + 16 <= length) {
+        distance += block_mismatches(string1 + i, string2 + i);
+        i += 16;
+    }
+#endif
+    while (i + sizeof(uint64_t) <= length) {
+        memcpy(&word1, string1 + i, sizeof(uint64_t));
+        memcpy(&word2, string2 + i, sizeof(uint64_t));
+        distance += word_mismatches(word1, word2);
+        i += sizeof(uint64_t);
+    }
+    for (; i < length; i++) {
+        distance += (string1[i] != string2[i]);
+    }
+    return distance;
+}
+
+static int
 within_hamming_distance(
     const uint8_t *string1,
     size_t string1_length,
@@ -15,11 +85,34 @@ within_hamming_distance(
 {
     if (string1_length != string2_length) {
         // Hamming is technically only valid for sequences with the same
-        // length. 
+        // length.
         return 0;
     }
-    
-    for (size_t i=0; i < string1_length; i++) {
+
+    size_t i = 0;
+#ifdef DISTANCES_USE_SSE2
+    // Compare 16 characters at the time.
+    while (i + 16 <= string1_length) {
+        max_distance -= block_mismatches(string1 + i, string2 + i);
+        if (max_distance < 0) {
+            return 0;
+        }
+        i += 16;
+    }
+#endif
+    // Compare 8 characters at the time.
+    uint64_t word1;
+    uint64_t word2;
+    while (i + sizeof(uint64_t) <= string1_length) {
+        memcpy(&word1, string1 + i, sizeof(uint64_t));
+        memcpy(&word2, string2 + i, sizeof(uint64_t));
+        max_distance -= word_mismatches(word1, word2);
+        if (max_distance < 0) {
+            return 0;
+        }
+        i += sizeof(uint64_t);
+    }
+    for (; i < string1_length; i++) {
         if (string1[i] != string2[i]) {
             max_distance -= 1;
             if (max_distance < 0) {
@@ -30,8 +123,14 @@ within_hamming_distance(
     return 1;
 }
 
+/**
+ * @brief Check the edit distance by trying an insertion, a deletion and a
+ *        substitution at each mismatch. The work grows exponentially with
+ *        max_distance, so this is only used when within_edit_distance
+ *        cannot allocate its diagonals.
+ */
 static int
-within_edit_distance(
+within_edit_distance_recursive(
     const uint8_t *string1,
     size_t string1_length,
     const uint8_t *string2,
@@ -54,18 +153,18 @@ within_edit_distance(
             }
             int result;
             // Insertion. Compare string1's next character with current character string2.
-            result = within_edit_distance(string1 + 1, 
-                                          string1_length -1,
-                                          string2,
-                                          string2_length,
-                                          max_distance);
+            result = within_edit_distance_recursive(string1 + 1, 
+                                                    string1_length -1,
+                                                    string2,
+                                                    string2_length,
+                                                    max_distance);
             if (result) return result;
             // Deletion
-            result = within_edit_distance(string1, 
-                                          string1_length, 
-                                          string2 + 1,
-                                          string2_length -1,
-                                          max_distance);
+            result = within_edit_distance_recursive(string1, 
+                                                    string1_length, 
+                                                    string2 + 1,
+                                                    string2_length -1,
+                                                    max_distance);
             if (result) return result;
             // Otherwise we have a substitution. Continue the loop.
         }
@@ -85,4 +184,136 @@ within_edit_distance(
         return 0;
     }
     return 1;
-}
\ No newline at end of file
+}
+
+// The diagonals of within_edit_distance are kept on the stack for distances
+// up to 128. More diagonals are allocated on the heap.
+#define EDIT_DISTANCE_STACK_DIAGONALS (2 * 128 + 3)
+
+/**
+ * @brief Check whether the edit distance between two strings is at most
+ *        max_distance.
+ *
+ * This uses the diagonal method of Landau and Vishkin. Diagonal d of the
+ * dynamic programming matrix holds the cells where string2's position minus
+ * string1's position equals d. For each number of edits e the furthest
+ * reachable position on each diagonal is derived from the positions for e - 1
+ * edits. From there matching characters are skipped without any further
+ * bookkeeping. Only diagonals -max_distance to max_distance can be reached.
+ * For similar strings the work is close to the string length plus
+ * max_distance squared. Dissimilar strings are rejected after a few
+ * characters per diagonal.
+ */
+static int
+within_edit_distance(
+    const uint8_t *string1,
+    size_t string1_length,
+    const uint8_t *string2,
+    size_t string2_length,
+    int max_distance)
+{
+    if (max_distance < 0) {
+        return 0;
+    }
+    size_t length_difference = string1_length > string2_length ?
+        string1_length - string2_length : string2_length - string1_length;
+    if (length_difference > (size_t)max_distance) {
+        return 0;
+    }
+    // A common prefix or suffix does not add to the distance.
+    while (string1_length > 0 && string2_length > 0 &&
+           string1[0] == string2[0]) {
+        string1 += 1;
+        string2 += 1;
+        string1_length -= 1;
+        string2_length -= 1;
+    }
+    while (string1_length > 0 && string2_length > 0 &&
+           string1[string1_length - 1] == string2[string2_length - 1]) {
+        string1_length -= 1;
+        string2_length -= 1;
+    }
+    size_t longest_length = string1_length > string2_length ?
+        string1_length : string2_length;
+    if (longest_length <= (size_t)max_distance) {
+        // Substituting and inserting every character is within the distance.
+        return 1;
+    }
+    if (max_distance < 2) {
+        // A single edit leaves at most one character in each string.
+        return 0;
+    }
+    ssize_t length1 = string1_length;
+    ssize_t length2 = string2_length;
+    ssize_t offset = max_distance + 1;
+    ssize_t number_of_diagonals = 2 * offset + 1;
+    // Furthest position in string1 per diagonal for the previous and the
+    // current number of edits. The outermost diagonals are never computed
+    // and only serve as neighbours.
+    ssize_t stack_diagonals[2 * EDIT_DISTANCE_STACK_DIAGONALS];
+    ssize_t *previous = stack_diagonals;
+    if (number_of_diagonals > EDIT_DISTANCE_STACK_DIAGONALS) {
+        previous = malloc(2 * number_of_diagonals * sizeof(ssize_t));
+        if (previous == NULL) {
+            // There is no way to report the error to the caller.
+            return within_edit_distance_recursive(string1, string1_length,
+                                                  string2, string2_length,
+                                                  max_distance);
+        }
+    }
+    ssize_t *allocation = previous;
+    ssize_t *current = previous + number_of_diagonals;
+    // Any unreachable position works, as positions below a diagonal's lower
+    // bound are discarded.
+    ssize_t unreachable = -2;
+    for (ssize_t d = 0; d < 2 * number_of_diagonals; d++) {
+        allocation[d] = unreachable;
+    }
+    // With -1 edits, position -1 on diagonal 0 yields position 0 after a
+    // substitution. This starts the search without special casing.
+    previous[offset] = -1;
+    ssize_t target_diagonal = length2 - length1;
+    int result = 0;
+    for (ssize_t edits = 0; edits <= max_distance; edits++) {
+        ssize_t lowest_diagonal = edits < length1 ? -edits : -length1;
+        ssize_t highest_diagonal = edits < length2 ? edits : length2;
+        for (ssize_t d = lowest_diagonal; d <= highest_diagonal; d++) {
+            ssize_t index = d + offset;
+            // Substitution and deletion advance in string1, an insertion
+            // only advances in string2.
+            ssize_t position = previous[index] + 1;
+            if (previous[index + 1] + 1 > position) {
+                position = previous[index + 1] + 1;
+            }
+            if (previous[index - 1] > position) {
+                position = previous[index - 1];
+            }
+            ssize_t lowest_position = d < 0 ? -d : 0;
+            if (position < lowest_position) {
+                current[index] = unreachable;
+                continue;
+            }
+            ssize_t highest_position = d > target_diagonal ? length2 - d : length1;
+            if (position > highest_position) {
+                position = highest_position;
+            }
+            while (position < highest_position &&
+                   string1[position] == string2[position + d]) {
+                position += 1;
+            }
+            current[index] = position;
+            if (d == target_diagonal && position == length1) {
+                result = 1;
+                goto finish;
+            }
+        }
+        ssize_t *swap = previous;
+        previous = current;
+        current = swap;
+    }
+finish:
+    if (allocation != stack_diagonals) {
+        free(allocation);
+    }
+    return result;
+}
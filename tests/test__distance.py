@@ -14,7 +14,8 @@
 # You should have received a copy of the GNU Affero General Public License
 # along with fastqdedup.  If not, see <https://www.gnu.org/licenses/
 
-from fastqdedup._distance import within_distance
+from fastqdedup._distance import (hamming_distance, split_within_distance,
+                                  within_distance)
 
 import pytest
 
@@ -27,7 +28,11 @@ import pytest
         ("AAAA", "AAAC", 1, True),
         ("AAAA", "AAAC", 0, False),
         ("AACA", "AAAC", 2, True),
-        ("AACC", "CCAA", 3, False)
+        ("AACC", "CCAA", 3, False),
+        ("GATTACAGATTACA", "GATTACAGATTACC", 1, True),
+        ("GATTACAGATTACA", "CATTACAGATTACC", 1, False),
+        ("GATTACAGATTACA", "CATTACAGATTACC", 2, True),
+        ("GATTACAGATTACA", "GATTACAGATTAC", 1, False),
     ]
 )
 def test_within_distance_hamming(string1, string2, max_distance, result):
@@ -52,9 +57,55 @@ def test_within_distance_hamming(string1, string2, max_distance, result):
         ("AAAGC", "GC", 3, True),
         ("GC", "AAAGC", 2, False),
         ("ABCDE", "ABDE", 1, True),
-        ("ABCDE", "ABDEF", 2, True)
+        ("ABCDE", "ABDEF", 2, True),
+        ("GATTACAGATTACA", "ATTACAGATACAG", 3, True),
+        ("GATTACAGATTACA", "ATTACAGATACAG", 2, False),
+        ("ACGTACGTACGTACGT", "TGCATGCATGCATGCA", 9, False),
+        ("ACGTACGTACGTACGT", "TGCATGCATGCATGCA", 10, True),
+        # Distances this large do not fit on the stack.
+        ("A" * 300, "C" * 150 + "A" * 150, 150, True),
+        ("A" * 300, "C" * 150 + "A" * 150, 149, False),
     ]
 )
 def test_within_distance_levenshtein(string1, string2, max_distance, result):
     assert within_distance(string1, string2, max_distance,
                            use_edit_distance=True) is result
+
+
+@pytest.mark.parametrize(
+    ["string1", "string2", "result"],
+    [
+        ("", "", 0),
+        ("AAAA", "AAAA", 0),
+        ("AAAA", "AAAC", 1),
+        ("AACC", "CCAA", 4),
+        ("GATTACAGATTACA", "CATTACAGATTACC", 2),
+    ]
+)
+def test_hamming_distance(string1, string2, result):
+    assert hamming_distance(string1, string2) == result
+
+
+def test_hamming_distance_unequal_length():
+    with pytest.raises(ValueError) as error:
+        hamming_distance("AAAA", "AAA")
+    error.match("same length")
+
+
+def test_split_within_distance():
+    items = [(1, "AAAA"), (5, "AAAC"), (2, "CCCC"), (3, "AACC"), (1, "AAA")]
+    within, others = split_within_distance("AAAT", items, 1)
+    assert within == [(1, "AAAA"), (5, "AAAC")]
+    assert others == [(2, "CCCC"), (3, "AACC"), (1, "AAA")]
+    within, others = split_within_distance("AAAT", items, 1,
+                                           use_edit_distance=True)
+    assert within == [(1, "AAAA"), (5, "AAAC"), (1, "AAA")]
+    within, others = split_within_distance("AAAT", items, 1, max_count=4)
+    assert within == [(1, "AAAA")]
+    assert others == [(5, "AAAC"), (2, "CCCC"), (3, "AACC"), (1, "AAA")]
+
+
+def test_split_within_distance_wrong_item():
+    with pytest.raises(TypeError) as error:
+        split_within_distance("AAAA", [(1, "AAAA", 3)], 1)
+    error.match("count, string")
@@ -1,4 +1,4 @@
-from fastqdedup._fastq import average_error_rate
+from fastqdedup._fastq import average_error_rate, join_slices
 
 import pytest
 
@@ -12,6 +12,19 @@ def test_average_error_rate_with_default_offset():
     assert average_error_rate(chr(43) + chr(63)) == 0.0505
 
 
+def test_average_error_rate_multiple_strings():
+    # (0.1 + 0.001 + 0.1 + 0.1) / 4 == 0.07525
+    assert average_error_rate([chr(43) + chr(63), "", chr(43), chr(43)]) == \
+        pytest.approx(0.07525)
+    assert average_error_rate((chr(43), chr(63))) == 0.0505
+
+
+def test_average_error_rate_sequence_wrong_type():
+    with pytest.raises(TypeError) as error:
+        average_error_rate([chr(43), b"+"])
+    error.match("must be a str or a sequence of str")
+
+
 @pytest.mark.parametrize("i", list(range(33)) + [127])
 def test_average_error_rate_out_of_range(i):
     with pytest.raises(ValueError) as error:
@@ -23,3 +36,30 @@ def test_average_error_rate_non_ascii():
     with pytest.raises(ValueError) as error:
         average_error_rate(chr(128))
     error.match("phred_scores must be ASCII encoded")
+
+
+@pytest.mark.parametrize("slices", [
+    [slice(None)] * 3,
+    [slice(2), slice(1, 3), slice(-2, None)],
+    [slice(None, None, 2), slice(None, None, -1), slice(5, 1, -2)],
+    [slice(10, 20), slice(-20, 3), slice(3, 1)],
+])
+def test_join_slices(slices):
+    strings = ["ACGTAC", "GGTTA", "CATTAG"]
+    assert join_slices(strings, slices) == "".join(
+        string[slc] for string, slc in zip(strings, slices))
+
+
+def test_join_slices_unequal_length():
+    with pytest.raises(ValueError) as error:
+        join_slices(["ACGT", "ACGT"], [slice(2)])
+    error.match("same length")
+
+
+def test_join_slices_wrong_type():
+    with pytest.raises(TypeError) as error:
+        join_slices(["ACGT", b"ACGT"], [slice(2), slice(2)])
+    error.match("must be a sequence of str")
+    with pytest.raises(TypeError) as error:
+        join_slices(["ACGT"], [2])
+    error.match("must be a sequence of slice objects")
@@ -0,0 +1,95 @@
+# Copyright (C) 2022 Leiden University Medical Center
+# This file is part of fastqdedup
+#
+# fastqdedup is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# fastqdedup is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with fastqdedup.  If not, see <https://www.gnu.org/licenses/
+
+import random
+
+from fastqdedup._hashset import HashSet
+
+import pytest
+
+
+def test_hash_set_add():
+    hash_set = HashSet()
+    assert len(hash_set) == 0
+    assert 1 not in hash_set
+    hash_set.add(1)
+    hash_set.add(-2**63)
+    hash_set.add(2**63 - 1)
+    hash_set.add(1)
+    assert len(hash_set) == 3
+    assert 1 in hash_set
+    assert -2**63 in hash_set
+    assert 2**63 - 1 in hash_set
+    assert 0 not in hash_set
+
+
+def test_hash_set_remove():
+    hash_set = HashSet()
+    hash_set.add(1)
+    hash_set.add(2)
+    hash_set.remove(1)
+    assert 1 not in hash_set
+    assert 2 in hash_set
+    assert len(hash_set) == 1
+    with pytest.raises(KeyError):
+        hash_set.remove(1)
+    # Adding again after removal.
+    hash_set.add(1)
+    assert 1 in hash_set
+    assert len(hash_set) == 2
+
+
+def test_hash_set_overflow():
+    hash_set = HashSet()
+    with pytest.raises(OverflowError):
+        hash_set.add(2**63)
+
+
+@pytest.mark.parametrize("max_value", [5000, 2**63])
+def test_hash_set_same_as_set(max_value):
+    rng = random.Random(42)
+    values = [rng.randrange(-max_value, max_value) for _ in range(10000)]
+    hash_set = HashSet()
+    reference = set()
+    for _ in range(20000):
+        value = rng.choice(values)
+        action = rng.random()
+        if action < 0.6:
+            hash_set.add(value)
+            reference.add(value)
+        elif action < 0.8:
+            assert (value in hash_set) == (value in reference)
+        elif value in reference:
+            hash_set.remove(value)
+            reference.remove(value)
+    assert len(hash_set) == len(reference)
+    for value in values:
+        assert (value in hash_set) == (value in reference)
+
+
+@pytest.mark.parametrize("value", [0, -1])
+def test_hash_set_marker_values(value):
+    hash_set = HashSet()
+    assert value not in hash_set
+    hash_set.add(value)
+    hash_set.add(value)
+    assert value in hash_set
+    assert len(hash_set) == 1
+    hash_set.remove(value)
+    assert value not in hash_set
+    assert len(hash_set) == 0
+    with pytest.raises(KeyError):
+        hash_set.remove(value)
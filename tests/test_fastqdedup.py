@@ -14,10 +14,17 @@
 # You should have received a copy of the GNU Affero General Public License
 # along with fastqdedup.  If not, see <https://www.gnu.org/licenses/
 
+from typing import List, Tuple
+
+import dnaio
+
 from fastqdedup import (
     cluster_dissection_adjacency,
     cluster_dissection_directional,
     cluster_dissection_highest_count,
+    deduplicate_cluster,
+    joinfunc_from_check_slices,
+    keyfunc_from_check_slices,
     length_string_to_slices,
 )
 
@@ -34,6 +41,26 @@ def test_length_string_to_slices(string, result):
     assert length_string_to_slices(string) == result
 
 
+@pytest.mark.parametrize("check_slices", [
+    [slice(5)],
+    [slice(5), slice(2, 8)],
+    [slice(5), slice(None), slice(-3, None, -1)],
+])
+def test_keyfunc_from_check_slices(check_slices):
+    sequences = ["ACGTACGTAC", "GGGGTTTTCC", "ACACACACAC"]
+    records = tuple(dnaio.SequenceRecord(f"read{i}", sequence)
+                    for i, sequence
+                    in enumerate(sequences[:len(check_slices)]))
+    keyfunc = keyfunc_from_check_slices(check_slices)
+    assert keyfunc(records) == "".join(
+        record.sequence[slc] for record, slc in zip(records, check_slices))
+
+
+def test_joinfunc_from_check_slices():
+    joinfunc = joinfunc_from_check_slices([slice(5), slice(2, 8)])
+    assert joinfunc(["ACGTACGTAC", "GGGGTTTTCC"]) == "ACGTAGGTTTT"
+
+
 class TestClusterDissection:
     TEST_CLUSTER = [
         (3, "AAAGT"),   # Derived
@@ -95,3 +122,50 @@ class TestClusterDissection:
     def test_all_reads_same_cluster(self, function):
         cluster = [(7, "AAAA"), (1, "AAAT"), (1, "CAAA")]
         assert set(function(cluster)) == {"AAAA"}
+
+
+TEST_READS = [
+    ("read1", "AAAA", "IIII"),
+    ("read2", "AAAA", "IIII"),
+    ("read3", "AAAC", "IIII"),
+    ("read4", "CCCC", "IIII"),
+    ("read5", "GGGG", "!!!!"),  # Low quality, should be discarded
+]
+
+
+def write_fastq(path, reads: List[Tuple[str, str, str]]):
+    with dnaio.open(str(path), mode="w") as writer:
+        for name, sequence, qualities in reads:
+            writer.write(dnaio.SequenceRecord(name, sequence, qualities))
+
+
+def read_names(path) -> List[str]:
+    with dnaio.open(str(path)) as reader:
+        return [record.name for record in reader]
+
+
+@pytest.mark.parametrize(["max_distance", "expected"], [
+    (0, ["read1", "read3", "read4"]),
+    (1, ["read1", "read4"]),
+])
+def test_deduplicate_cluster(tmp_path, max_distance, expected):
+    input_file = tmp_path / "input.fastq"
+    output_file = tmp_path / "output.fastq"
+    write_fastq(input_file, TEST_READS)
+    deduplicate_cluster([str(input_file)], [str(output_file)], None,
+                        max_distance=max_distance)
+    assert read_names(output_file) == expected
+
+
+@pytest.mark.parametrize("max_distance", [0, 1])
+def test_deduplicate_cluster_discarded_duplicate_not_written(tmp_path,
+                                                             max_distance):
+    input_file = tmp_path / "input.fastq"
+    output_file = tmp_path / "output.fastq"
+    # More than eight discarded records, so the discarded bitmap spans
+    # multiple bytes.
+    write_fastq(input_file, [(f"read{i}", "AAAA", "!!!!") for i in range(9)] +
+                [("read9", "AAAA", "IIII")])
+    deduplicate_cluster([str(input_file)], [str(output_file)], None,
+                        max_distance=max_distance)
+    assert read_names(output_file) == ["read9"]
@@ -14,6 +14,8 @@
 # You should have received a copy of the GNU Affero General Public License
 # along with fastqdedup.  If not, see <https://www.gnu.org/licenses/
 
+import sys
+
 from fastqdedup import Trie
 
 import pytest
@@ -170,3 +172,13 @@ def test_trie_number_of_sequences():
         except LookupError:
             break
     assert trie.number_of_sequences == 0
+
+
+def test_trie_pop_cluster_no_reference_leak():
+    trie = Trie()
+    trie.add_sequence("AAAA")
+    trie.add_sequence("AAAC")
+    cluster = trie.pop_cluster(1)
+    assert len(cluster) == 2
+    # Only referenced by the list and the getrefcount argument.
+    assert sys.getrefcount(cluster[0]) == sys.getrefcount(cluster[1])